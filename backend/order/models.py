@@ -1,5 +1,7 @@
+from django.core.cache import cache
 from django.db import models
-from django.db.models.signals import pre_delete
+from django.db.models.constraints import UniqueConstraint
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
@@ -7,6 +9,8 @@ from django_countries.fields import CountryField
 from store.models import Product
 from vendor.models import Vendor
 
+ORDER_LIST_CACHE_VERSION = "orders:v"
+
 
 class Order(models.Model):
     ORDER_STATUS = (
@@ -59,6 +63,12 @@ class Order(models.Model):
         ordering = ["-created_at"]
         verbose_name = _("Order")
         verbose_name_plural = _("Orders")
+        constraints = [
+            UniqueConstraint(
+                fields=["buyer", "product"],
+                name="unique_buyer_product_order",
+            ),
+        ]
 
     def save(self, *args, **kwargs) -> None:
         """
@@ -129,3 +139,20 @@ def reset_product_is_available(sender, instance, **kwargs) -> None:
 
     instance.product.is_available = True
     instance.product.save()
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderDetail)
+@receiver(post_delete, sender=OrderDetail)
+def invalidate_order_list_cache(sender, instance, **kwargs) -> None:
+    """
+    Invalidate the cached order lists of this process by bumping the cache version namespace.
+    Other processes pick up changes through the database fingerprint in the cache key.
+
+    """
+
+    try:
+        cache.incr(ORDER_LIST_CACHE_VERSION)
+    except ValueError:
+        cache.set(ORDER_LIST_CACHE_VERSION, 1, None)
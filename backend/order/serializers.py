@@ -1,3 +1,6 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from rest_flex_fields import FlexFieldsModelSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import MethodNotAllowed, NotFound
@@ -9,8 +12,22 @@ from store.serializers import (
 
 from .models import Order, OrderDetail
 
-available = ("OFFERED", "DENIED", "PENDING")
-sold = ("PROCESSING", "ACCEPTED", "COMPLETED")
+available = frozenset(("OFFERED", "DENIED", "PENDING"))
+sold = frozenset(("PROCESSING", "ACCEPTED", "COMPLETED"))
+
+
+def _validate_post(serializer, data: dict, product: Product) -> None:
+    # Ensure the first offer is never more than the price of the product
+    serializer._validate_amount(data, product)
+
+
+def _validate_update(serializer, data: dict, product: Product) -> None:
+    # Only the buyer can change the offer amount, so only their updates are checked
+    if serializer.context["request"].user.vendor == serializer.instance.buyer:
+        serializer._validate_amount(data, product)
+
+
+_VALIDATORS = {"POST": _validate_post, "PUT": _validate_update, "PATCH": _validate_update}
 
 
 class OrderPreviewSerializer(serializers.ModelSerializer):
@@ -32,6 +49,33 @@ class OrderPreviewSerializer(serializers.ModelSerializer):
         ]
 
 
+class OrderPreviewListSerializer(serializers.Serializer):
+    """
+    Flat, read-only order preview for list responses.
+    Related values are read straight off the eager loaded relations instead of
+    instantiating a nested serializer per order.
+    """
+
+    id = serializers.IntegerField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    amount = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+    product_id = serializers.IntegerField(read_only=True)
+    product_title = serializers.CharField(source="product.title", read_only=True)
+    product_slug = serializers.CharField(source="product.slug", read_only=True)
+    product_price = serializers.DecimalField(
+        source="product.price", max_digits=8, decimal_places=2, read_only=True
+    )
+    product_is_available = serializers.BooleanField(
+        source="product.is_available", read_only=True
+    )
+    vendor_id = serializers.IntegerField(read_only=True)
+    vendor_name = serializers.CharField(source="vendor.name", read_only=True)
+    buyer_id = serializers.IntegerField(read_only=True)
+    buyer_name = serializers.CharField(source="buyer.name", read_only=True)
+
+
 class OrderDetailSerializer(FlexFieldsModelSerializer):
     # order = OrderPreviewSerializer(read_only=True)
 
@@ -61,6 +105,28 @@ class OrderDetailReadSerializer(FlexFieldsModelSerializer):
         fields = "__all__"
 
 
+class OrderFullListSerializer(serializers.ListSerializer):
+    def to_representation(self, data) -> list:
+        """
+        The to_representation function batches the related lookups of every order in the list
+        before serializing them, so nested lists of orders do not query per order.
+        Relations the caller already prefetched are left untouched.
+
+        Args:
+            self: Access the class object within a method
+            data: Get the orders, as a manager, queryset or list
+
+        Returns:
+            A list of serialized orders
+        """
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        orders = list(iterable)
+        prefetch_related_objects(
+            orders, "order_detail", "product", "product__vendor", "vendor", "buyer"
+        )
+        return super().to_representation(orders)
+
+
 class OrderFullSerializer(serializers.ModelSerializer):
     vendor = VendorPreviewSerializer(read_only=True)
     buyer = VendorPreviewSerializer(read_only=True)
@@ -80,6 +146,7 @@ class OrderFullSerializer(serializers.ModelSerializer):
             "updated_at",
             "order_detail",
         ]
+        list_serializer_class = OrderFullListSerializer
 
 
 class OrderSerializer(FlexFieldsModelSerializer):
@@ -107,10 +174,29 @@ class OrderSerializer(FlexFieldsModelSerializer):
             "order_detail": {"required": False},
         }
 
+    def _validate_amount(self, data: dict, product: Product) -> None:
+        """
+        The _validate_amount function ensures an offer is never more than the price of the product.
+
+        Args:
+            self: Access the current instance of the class
+            data: Pass in the validated data
+            product: Get the product the offer is made on
+        """
+        amount = data.get("amount")
+        price = product.price
+
+        if amount is not None and amount > price:
+            raise MethodNotAllowed(
+                {"message": f"Your offer must not be greater than {price}"}
+            )
+
     def validate(self, data: dict) -> dict:
         """
-        The validate function checks if the buyer has already made an offer for this product.
-        It also ensures that the first offer is never more than the price of the product.
+        The validate function ensures that the first offer is never more than the price of the product.
+        Duplicate offers from the same buyer are rejected by the database on create.
+        Method specific rules are looked up in _VALIDATORS. Partial updates that change the
+        amount are checked against the order's product when the payload carries none.
 
         Args:
             self: Access the current instance of the class
@@ -120,39 +206,21 @@ class OrderSerializer(FlexFieldsModelSerializer):
             The data if it is valid
         """
 
-        # If it's a post request
-        instance = getattr(self, "instance", None)
-        print("instance", instance)
-        if self.context["request"]._request.method == "POST":
-
-            # Reject offer if buyer has already have a standing offer for the product
-            if Order.objects.filter(
-                    buyer=data["buyer"], product=data["product"]
-            ).exists():
-                raise MethodNotAllowed(
-                    {"message": "This product is already in your orders."}
-                )
-
-            # Ensure the first offer is never more than the price of the product
-            if float(data["amount"]) > float(data["product"].price):
-                raise MethodNotAllowed(
-                    {
-                        "message": f"Your offer must not be greater than {data['product'].price}"
-                    }
-                )
-
-        if self.context["request"]._request.method == "PUT":
-            # Ensure updates to offer amounts are validated only on put requests
-            if self.context["request"].user.vendor == instance.buyer:
-                if float(data["amount"]) > float(data["product"].price):
-                    raise MethodNotAllowed(
-                        {
-                            "message": f"Your offer must not be greater than {data['product'].price}"
-                        }
-                    )
+        validator = _VALIDATORS.get(self.context["request"].method)
+        if validator is None:
+            return data
 
-        # Reject offer if product is no longer available
-        if not data["product"].is_available:
+        product = data.get("product")
+        if product is None and "amount" in data and self.instance is not None:
+            product = self.instance.product
+        if product is None:
+            return data
+
+        validator(self, data, product)
+
+        # Reject offer if product is no longer available,
+        # new offers are checked under a row lock in create instead
+        if self.instance is not None and not product.is_available:
             raise NotFound({"message": "This product is no longer available."})
 
         return data
@@ -162,7 +230,8 @@ class OrderSerializer(FlexFieldsModelSerializer):
         The create function creates a new order instance.
         It takes in the validated_data and uses it to create an Order object.
         The amount is taken from the product price, unless otherwise specified by the user.
-        If there is no change in status, then it will be marked as PROCESSING.
+        The status is decided before the insert: PROCESSING for a full price purchase, OFFERED otherwise.
+        The product row is locked while the order is created, so two buyers cannot purchase it at once.
 
         Args:
             self: Reference the current instance of the model
@@ -171,27 +240,35 @@ class OrderSerializer(FlexFieldsModelSerializer):
         Returns:
             The newly created object
         """
-        request = self.context["request"]
-        buyer = request.user.vendor
-
-        product = Product.objects.get(id=request.data.get("product"))
+        buyer = self.context["request"].user.vendor
+        product = validated_data["product"]
         amount = validated_data.get("amount", product.price)
-        instance = Order.objects.create(buyer=buyer, product=product, amount=amount)
-
-        if float(instance.amount) < float(product.price):
-            instance.status = "OFFERED"
-        if float(instance.amount) == float(product.price):
-            instance.status = "PROCESSING"
-
-        if instance.status == "PROCESSING":
-            # Mark product as no longer available
-            Product.objects.filter(id=instance.product.id).update(is_available=False)
-
-        if instance.status == "OFFERED":
-            # Mark product as still available
-            Product.objects.filter(id=instance.product.id).update(is_available=True)
+        status = "PROCESSING" if amount == product.price else "OFFERED"
+
+        with transaction.atomic():
+            # Lock the product row and reject offer if it is no longer available
+            locked = Product.objects.select_for_update().filter(
+                pk=product.pk, is_available=True
+            )
+            if not locked.exists():
+                raise NotFound({"message": "This product is no longer available."})
+
+            try:
+                with transaction.atomic():
+                    instance = Order.objects.create(
+                        buyer=buyer, product=product, amount=amount, status=status
+                    )
+            except IntegrityError:
+                # Reject offer if buyer has already have a standing offer for the product
+                if Order.objects.filter(buyer=buyer, product=product).exists():
+                    raise MethodNotAllowed(
+                        {"message": "This product is already in your orders."}
+                    )
+                raise
 
-        instance.save()
+            # Product stays available while it is only on offer
+            product.is_available = instance.status == "OFFERED"
+            product.save(update_fields=["is_available"])
 
         return instance
 
@@ -213,39 +290,45 @@ class OrderSerializer(FlexFieldsModelSerializer):
         """
 
         user = self.context["request"].user.vendor
-
-        product_data = validated_data["product"]
-        product = Product.objects.get(id=product_data.id)
+        product = validated_data.get("product", instance.product)
+        changed = {}
 
         if user == instance.vendor:
             # seller can update status
-            print("request is from vendor")
-            instance.status = validated_data.get("status", instance.status)
-            print("result", instance.status)
+            changed["status"] = validated_data.get("status", instance.status)
 
         if user == instance.buyer:
-            # buyer can update amount
-            instance.amount = validated_data.get("amount", instance.amount)
-
-            if float(instance.amount) < float(product.price):
-                instance.status = "OFFERED"
-
-            if float(instance.amount) == float(product.price):
-                instance.status = "PROCESSING"
-
-        instance.save()
-
-        if instance.status in sold:
-            # Mark product as no longer available
-            product.is_available = False
-            product.save()
-            instance.product.is_available = False
-
-        if instance.status in available:
-            # Mark product as available
-            product.is_available = True
-            product.save()
-            instance.product.is_available = True
+            # buyer can update amount, an empty amount is a purchase at full price
+            amount = validated_data.get("amount", instance.amount) or product.price
+            changed["amount"] = amount
+            changed["status"] = changed.get("status", instance.status)
+
+            if amount < product.price:
+                changed["status"] = "OFFERED"
+
+            if amount == product.price:
+                changed["status"] = "PROCESSING"
+
+        with transaction.atomic():
+            if changed:
+                # QuerySet.update skips auto_now, so updated_at is set explicitly
+                changed["updated_at"] = timezone.now()
+                Order.objects.filter(pk=instance.pk).update(**changed)
+                for field, value in changed.items():
+                    setattr(instance, field, value)
+
+            is_available = None
+            if instance.status in sold:
+                # Mark product as no longer available
+                is_available = False
+            elif instance.status in available:
+                # Mark product as available
+                is_available = True
+
+            if is_available is not None:
+                Product.objects.filter(pk=product.pk).update(is_available=is_available)
+                product.is_available = is_available
+                # The validated product is a separate object from the one rendered in the response
+                instance.product.is_available = is_available
 
-        instance.product.save()
         return instance
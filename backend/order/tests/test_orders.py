@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from store.models import Category, Product
+
+from order.models import Order
+
+
+class OrderSerializerTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.seller = User.objects.create_user(username="seller", password="pass")
+        self.buyer = User.objects.create_user(username="buyer", password="pass")
+        category = Category.objects.create(name="Shoes", slug="shoes")
+        self.product = Product.objects.create(
+            category=category,
+            vendor=self.seller.vendor,
+            title="Boots",
+            price=Decimal("50.00"),
+        )
+        self.list_url = reverse("order:vendor_order-list")
+
+    def make_offer(self, amount: str = "40.00") -> Order:
+        return Order.objects.create(
+            product=self.product,
+            buyer=self.buyer.vendor,
+            amount=Decimal(amount),
+            status="OFFERED",
+        )
+
+    def detail_url(self, order: Order) -> str:
+        return reverse("order:vendor_order-detail", kwargs={"id": order.id})
+
+    def post_offer(self, amount: str = "40.00"):
+        return self.client.post(
+            self.list_url,
+            {
+                "product": self.product.id,
+                "buyer": self.buyer.vendor.id,
+                "amount": amount,
+            },
+            format="json",
+        )
+
+    def test_duplicate_offer_is_rejected(self) -> None:
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.post_offer().status_code, status.HTTP_201_CREATED)
+
+        response = self.post_offer()
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertIn("already in your orders", str(response.data))
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_offer_on_unavailable_product_is_not_found(self) -> None:
+        self.product.is_available = False
+        self.product.save()
+        self.client.force_authenticate(self.buyer)
+
+        response = self.post_offer()
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Order.objects.exists())
+
+    def test_partial_update_above_price_is_rejected(self) -> None:
+        order = self.make_offer()
+        self.client.force_authenticate(self.buyer)
+
+        response = self.client.patch(
+            self.detail_url(order), {"amount": "99.00"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        order.refresh_from_db()
+        self.assertEqual(order.amount, Decimal("40.00"))
+
+    def test_full_price_update_marks_product_unavailable(self) -> None:
+        order = self.make_offer()
+        self.client.force_authenticate(self.buyer)
+
+        response = self.client.put(
+            self.detail_url(order) + "?expand=product",
+            {
+                "product": self.product.id,
+                "buyer": self.buyer.vendor.id,
+                "amount": "50.00",
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "PROCESSING")
+        self.assertFalse(response.data["product"]["is_available"])
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.is_available)
+
+    def test_order_list_reflects_update_after_cached_read(self) -> None:
+        order = self.make_offer()
+        self.client.force_authenticate(self.buyer)
+
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data[0]["status"], "OFFERED")
+
+        self.client.put(
+            self.detail_url(order),
+            {
+                "product": self.product.id,
+                "buyer": self.buyer.vendor.id,
+                "amount": "50.00",
+            },
+            format="json",
+        )
+
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data[0]["status"], "PROCESSING")
@@ -1,15 +1,77 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch
 from rest_flex_fields import FlexFieldsModelViewSet
 from rest_framework import generics
 from rest_framework.permissions import (AllowAny,)
 from rest_framework.response import Response
+from store.serializers import ProductPreviewSerializer, VendorPreviewSerializer
 
+from .models import ORDER_LIST_CACHE_VERSION
 from .models import Order as OrderModel
 from .models import OrderDetail
-from .serializers import OrderDetailSerializer, OrderSerializer
+from .serializers import (
+    OrderDetailSerializer,
+    OrderPreviewListSerializer,
+    OrderSerializer,
+)
+
+
+def get_preview_columns(serializer_class) -> tuple:
+    """
+    The get_preview_columns function returns the model columns a serializer renders.
+    It filters the serializer's Meta.fields down to the model's concrete fields, so method
+    and reverse relation fields are left out and new fields are picked up automatically.
+
+    Args:
+        serializer_class: Get the serializer whose Meta.fields are read
+
+    Returns:
+        The names of the concrete model fields the serializer renders
+    """
+    meta = serializer_class.Meta
+    concrete = {field.name for field in meta.model._meta.concrete_fields}
+    return tuple(field for field in meta.fields if field in concrete)
+
+
+ORDER_FIELDS = get_preview_columns(OrderSerializer)
+VENDOR_PREVIEW_FIELDS = get_preview_columns(VendorPreviewSerializer)
+PRODUCT_PREVIEW_FIELDS = get_preview_columns(ProductPreviewSerializer)
+
+
+def get_order_queryset():
+    """
+    The get_order_queryset function returns the Order queryset with every relation
+    the order serializers render loaded up front.
+    Vendor, buyer, product and the product's vendor and category are joined in with
+    select_related, and the order details are fetched in one extra query, so these relations
+    no longer cost a query per order. The method fields of the expanded preview serializers
+    (product image, vendor counts and order lists) still query per row.
+    The joined rows are narrowed to the columns the preview serializers render.
+
+    Returns:
+        A queryset of orders with their vendor, buyer, product and order details eager loaded
+    """
+    return (
+        OrderModel.objects.select_related(
+            "vendor", "buyer", "product", "product__vendor", "product__category"
+        )
+        .only(
+            *ORDER_FIELDS,
+            *("vendor__" + field for field in VENDOR_PREVIEW_FIELDS),
+            *("buyer__" + field for field in VENDOR_PREVIEW_FIELDS),
+            *("product__" + field for field in PRODUCT_PREVIEW_FIELDS),
+            *("product__vendor__" + field for field in VENDOR_PREVIEW_FIELDS),
+            "product__category__id",
+            "product__category__name",
+        )
+        .prefetch_related(Prefetch("order_detail", queryset=OrderDetail.objects.all()))
+    )
 
 
 class OrderListView(generics.ListAPIView):
-    queryset = OrderModel.objects.all()
+    queryset = get_order_queryset()
     serializer_class = OrderSerializer
     permission_classes = (AllowAny,)
 
@@ -26,6 +88,9 @@ class VendorOrderViewSet(FlexFieldsModelViewSet):
 
     Search Endpoint: `api/order/?search=<query>`
 
+    Flat List Endpoint: `api/order/?flat=true`
+    Lists orders with product, vendor and buyer flattened into primitive fields.
+
     Sample Request To Purchase or Make an Offer as a buyer:
     {
         "product": "1",
@@ -57,6 +122,75 @@ class VendorOrderViewSet(FlexFieldsModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = (AllowAny,)
 
+    def get_queryset(self) -> OrderModel:
+        """
+        The get_queryset function returns the orders with their related objects eager loaded,
+        so expanding vendor, buyer or product does not issue a query per order.
+
+        Args:
+            self: Reference the class itself
+
+        Returns:
+            All of the orders with their relations prefetched
+        """
+        return get_order_queryset()
+
+    def get_serializer_class(self):
+        """
+        The get_serializer_class function returns the flat preview serializer for list
+        requests that ask for it with `?flat=true`, and the flex serializer otherwise.
+
+        Args:
+            self: Reference the class itself
+
+        Returns:
+            The serializer class for the current action
+        """
+        if self.action == "list" and self.request.query_params.get("flat") == "true":
+            return OrderPreviewListSerializer
+        return super().get_serializer_class()
+
+    def list(self, request, *args, **kwargs) -> Response:
+        """
+        The list function returns the serialized order list from the cache when it can.
+        Only the plain payload is cached, which holds nothing but order columns and order detail ids.
+        Requests that expand or flatten the related vendor, buyer or product are always
+        serialized fresh, since those rows change without touching any order.
+        The cache key hashes the user, the query params and a fingerprint read from the database,
+        the order and order detail counts and their latest updates, so every worker
+        sees the same key after an order or order detail changes.
+
+        Args:
+            self: Reference the class itself
+            request: Get the current user and query params
+            *args: Pass a variable number of arguments to a function
+            **kwargs: Pass any number of additional arguments to the view
+
+        Returns:
+            The serialized list of orders
+        """
+        if any(param in request.query_params for param in ("expand", "flat")):
+            return super().list(request, *args, **kwargs)
+
+        version = cache.get_or_set(ORDER_LIST_CACHE_VERSION, 1, None)
+        fingerprint = OrderModel.objects.aggregate(
+            order_count=Count("id", distinct=True),
+            order_updated=Max("updated_at"),
+            detail_count=Count("order_detail", distinct=True),
+            detail_updated=Max("order_detail__updated_at"),
+        )
+        digest = hashlib.md5(
+            repr(
+                (request.user.pk, request.query_params.urlencode(), fingerprint)
+            ).encode()
+        ).hexdigest()
+        key = "orders:{}:{}".format(version, digest)
+        parent_list = super().list
+        data = cache.get_or_set(
+            key, lambda: parent_list(request, *args, **kwargs).data, 300
+        )
+        return Response(data)
+
 
 class VendorOrderDetailViewSet(FlexFieldsModelViewSet):
     """
@@ -77,7 +211,7 @@ class VendorOrderDetailViewSet(FlexFieldsModelViewSet):
 
 class Order(generics.RetrieveAPIView):
     lookup_field = "id"
-    queryset = OrderModel.objects.all()
+    queryset = get_order_queryset()
     serializer_class = OrderSerializer
 
 
@@ -88,7 +222,7 @@ class OrderItemListView(generics.ListAPIView):
 
 class OrderItem(generics.RetrieveAPIView):
     lookup_field = "id"
-    queryset = OrderModel.objects.all()
+    queryset = get_order_queryset()
     serializer_class = OrderSerializer
 
 